@@ -0,0 +1,164 @@
+from rpyp4sp import p4specast
+
+# generic traversal of the definitions of a spec, used by the analyses that
+# run once after load_spec. subclasses override visit_exp/visit_instr (and
+# call walk_exp/walk_instr to descend into the children) or one of the
+# more specific hooks.
+
+class AstVisitor(object):
+
+    def visit_def(self, definition):
+        if isinstance(definition, p4specast.DecD):
+            for arg in definition.args:
+                self.visit_arg(arg)
+            self.visit_instrs(definition.instrs)
+        elif isinstance(definition, p4specast.RelD):
+            self.visit_exps(definition.exps)
+            self.visit_instrs(definition.instrs)
+
+    def visit_instrs(self, instrs):
+        for instr in instrs:
+            self.visit_instr(instr)
+
+    def visit_exps(self, exps):
+        for exp in exps:
+            self.visit_exp(exp)
+
+    def visit_instr(self, instr):
+        self.walk_instr(instr)
+
+    def visit_exp(self, exp):
+        self.walk_exp(exp)
+
+    def visit_arg(self, arg):
+        if isinstance(arg, p4specast.ExpA):
+            self.visit_exp(arg.exp)
+        else:
+            assert isinstance(arg, p4specast.DefA)
+            self.visit_defa(arg)
+
+    def visit_defa(self, arg):
+        pass
+
+    def visit_phantom(self, phantom):
+        pass
+
+    def visit_path(self, path):
+        if isinstance(path, p4specast.IdxP):
+            self.visit_path(path.path)
+            self.visit_exp(path.exp)
+        elif isinstance(path, p4specast.SliceP):
+            self.visit_path(path.path)
+            self.visit_exp(path.start)
+            self.visit_exp(path.end)
+        elif isinstance(path, p4specast.DotP):
+            self.visit_path(path.path)
+        else:
+            assert isinstance(path, p4specast.RootP)
+
+    def visit_guard(self, guard):
+        if isinstance(guard, p4specast.CmpG):
+            self.visit_exp(guard.exp)
+        elif isinstance(guard, p4specast.MemG):
+            self.visit_exp(guard.exp)
+
+    def walk_instr(self, instr):
+        if isinstance(instr, p4specast.IfI):
+            self.visit_exp(instr.exp)
+            self.visit_instrs(instr.instrs)
+            self.visit_phantom(instr.phantom)
+        elif isinstance(instr, p4specast.HoldI):
+            self.visit_exps(instr.notexp.exps)
+            holdcase = instr.holdcase
+            if isinstance(holdcase, p4specast.BothH):
+                self.visit_instrs(holdcase.hold_instrs)
+                self.visit_instrs(holdcase.nothold_instrs)
+            elif isinstance(holdcase, p4specast.HoldH):
+                self.visit_instrs(holdcase.hold_instrs)
+                self.visit_phantom(holdcase.phantom)
+            else:
+                assert isinstance(holdcase, p4specast.NotHoldH)
+                self.visit_instrs(holdcase.nothold_instrs)
+                self.visit_phantom(holdcase.phantom)
+        elif isinstance(instr, p4specast.CaseI):
+            self.visit_exp(instr.exp)
+            for case in instr.cases:
+                self.visit_guard(case.guard)
+                self.visit_instrs(case.instrs)
+            self.visit_phantom(instr.phantom)
+        elif isinstance(instr, p4specast.OtherwiseI):
+            self.visit_instr(instr.instr)
+        elif isinstance(instr, p4specast.GroupI):
+            self.visit_exps(instr.exps)
+            self.visit_instrs(instr.instrs)
+        elif isinstance(instr, p4specast.LetI):
+            self.visit_exp(instr.var)
+            self.visit_exp(instr.value)
+        elif isinstance(instr, p4specast.RuleI):
+            self.visit_exps(instr.notexp.exps)
+        elif isinstance(instr, p4specast.ResultI):
+            self.visit_exps(instr.exps)
+        elif isinstance(instr, p4specast.ReturnI):
+            self.visit_exp(instr.exp)
+        else:
+            assert 0, "unknown instr"
+
+    def walk_exp(self, exp):
+        if isinstance(exp, p4specast.UnE):
+            self.visit_exp(exp.exp)
+        elif isinstance(exp, p4specast.BinE):
+            self.visit_exp(exp.left)
+            self.visit_exp(exp.right)
+        elif isinstance(exp, p4specast.CmpE):
+            self.visit_exp(exp.left)
+            self.visit_exp(exp.right)
+        elif isinstance(exp, p4specast.UpCastE):
+            self.visit_exp(exp.exp)
+        elif isinstance(exp, p4specast.DownCastE):
+            self.visit_exp(exp.exp)
+        elif isinstance(exp, p4specast.SubE):
+            self.visit_exp(exp.exp)
+        elif isinstance(exp, p4specast.MatchE):
+            self.visit_exp(exp.exp)
+        elif isinstance(exp, p4specast.TupleE):
+            self.visit_exps(exp.elts)
+        elif isinstance(exp, p4specast.ListE):
+            self.visit_exps(exp.elts)
+        elif isinstance(exp, p4specast.CaseE):
+            self.visit_exps(exp.notexp.exps)
+        elif isinstance(exp, p4specast.StrE):
+            for _, field_exp in exp.fields:
+                self.visit_exp(field_exp)
+        elif isinstance(exp, p4specast.OptE):
+            if exp.exp is not None:
+                self.visit_exp(exp.exp)
+        elif isinstance(exp, p4specast.ConsE):
+            self.visit_exp(exp.head)
+            self.visit_exp(exp.tail)
+        elif isinstance(exp, p4specast.CatE):
+            self.visit_exp(exp.left)
+            self.visit_exp(exp.right)
+        elif isinstance(exp, p4specast.MemE):
+            self.visit_exp(exp.elem)
+            self.visit_exp(exp.lst)
+        elif isinstance(exp, p4specast.LenE):
+            self.visit_exp(exp.lst)
+        elif isinstance(exp, p4specast.DotE):
+            self.visit_exp(exp.obj)
+        elif isinstance(exp, p4specast.IdxE):
+            self.visit_exp(exp.lst)
+            self.visit_exp(exp.idx)
+        elif isinstance(exp, p4specast.SliceE):
+            self.visit_exp(exp.lst)
+            self.visit_exp(exp.start)
+            self.visit_exp(exp.length)
+        elif isinstance(exp, p4specast.UpdE):
+            self.visit_exp(exp.exp)
+            self.visit_path(exp.path)
+            self.visit_exp(exp.value)
+        elif isinstance(exp, p4specast.CallE):
+            for arg in exp.args:
+                self.visit_arg(arg)
+        elif isinstance(exp, p4specast.IterE):
+            self.visit_exp(exp.exp)
+        # the remaining expressions (literals, VarE) have no children
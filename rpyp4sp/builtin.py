@@ -4,10 +4,13 @@ from rpyp4sp import p4specast, objects, integers
 from rpyp4sp.error import P4NotImplementedError, P4BuiltinError
 
 all_builtins = {}
+impure_builtins = {}
 
-def register_builtin(name, requires_ctx=False):
+def register_builtin(name, requires_ctx=False, pure=True):
     def decorator(func):
         all_builtins[name] = func, requires_ctx
+        if not pure:
+            impure_builtins[name] = None
         return func
     return decorator
 
@@ -15,6 +18,10 @@ def register_builtin(name, requires_ctx=False):
 def is_builtin(name):
     return name in all_builtins
 
+def is_pure_builtin(name):
+    # the result of a pure builtin depends only on its arguments
+    return name in all_builtins and name not in impure_builtins
+
 @jit.elidable
 def _get_function(name):
     return all_builtins.get(name, (None, False))
@@ -564,7 +571,7 @@ HOLDER = CounterHolder()
 
 TID_VART = p4specast.VarT(p4specast.Id('tid', p4specast.NO_REGION), [])
 
-@register_builtin("fresh_tid")
+@register_builtin("fresh_tid", pure=False)
 def fresh_fresh_tid(targs, values_input):
     assert targs == []
     assert values_input == []
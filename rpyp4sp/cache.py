@@ -0,0 +1,289 @@
+from rpython.rlib import jit, objectmodel
+from rpython.rlib.rarithmetic import intmask
+
+from rpyp4sp import objects
+
+# port of the result cache of P4-SpecTec (interp/cache.ml). relation results
+# are memoized in a bounded table keyed by the relation name and the input
+# values, evicting the least recently used entry when full. the same tables
+# are used to memoize the results of pure spec functions.
+
+# let is_cached_rule = function
+#   | "Sub_expl" | "Sub_impl" | "Type_wf" | "Type_alpha" -> true
+#   | _ -> false
+DEFAULT_CACHED_RELS = ["Sub_expl", "Sub_impl", "Type_wf", "Type_alpha"]
+
+DEFAULT_CAPACITY = 4096
+
+
+def _hash_combine(x, y):
+    return intmask((x ^ y) * 1000003)
+
+def _hash_values(values, x):
+    for value in values:
+        x = _hash_combine(x, hash_value(value))
+    return intmask(x ^ len(values))
+
+def hash_value(value):
+    # type: (objects.BaseV) -> int
+    """ structural hash of a value that is consistent with BaseV.eq, ie. it
+    ignores the types of the values. """
+    x = value._compare_tag
+    if isinstance(value, objects.BoolV):
+        return _hash_combine(x, int(value.value))
+    elif isinstance(value, objects.NumV):
+        return _hash_combine(x, hash_integer(value.value))
+    elif isinstance(value, objects.TextV):
+        return _hash_combine(x, objectmodel.compute_hash(value.value))
+    elif isinstance(value, objects.StructV):
+        return _hash_values(value._get_full_list(), x)
+    elif isinstance(value, objects.CaseV):
+        x = _hash_combine(x, objectmodel.compute_hash(value.mixop.tostring()))
+        return _hash_values(value._get_full_list(), x)
+    elif isinstance(value, objects.TupleV):
+        return _hash_values(value._get_full_list(), x)
+    elif isinstance(value, objects.ListV):
+        return _hash_values(value._get_full_list(), x)
+    elif isinstance(value, objects.OptV):
+        opt_value = value.get_opt_value()
+        if opt_value is None:
+            return x
+        return _hash_combine(x, hash_value(opt_value))
+    elif isinstance(value, objects.FuncV):
+        return _hash_combine(x, objectmodel.compute_hash(value.id.value))
+    else:
+        assert 0, "unknown value kind"
+
+def hash_integer(num):
+    from rpyp4sp.integers import SmallInteger, BigInteger
+    if isinstance(num, SmallInteger):
+        return num.val
+    assert isinstance(num, BigInteger)
+    # a BigInteger can hold a value that would fit into a machine word, it
+    # needs to hash the same as the equivalent SmallInteger
+    try:
+        return num.rval.toint()
+    except OverflowError:
+        return num.rval.hash()
+
+
+class RelCacheKey(object):
+    _immutable_fields_ = ['name', 'values[*]', 'hash']
+
+    def __init__(self, name, values):
+        self.name = name # type: str
+        self.values = values # type: list[objects.BaseV]
+        self.hash = _hash_values(values, objectmodel.compute_hash(name))
+
+    def __repr__(self):
+        return "cache.RelCacheKey(%r, %r)" % (self.name, self.values)
+
+def _key_eq(key_l, key_r):
+    if key_l.hash != key_r.hash or key_l.name != key_r.name:
+        return False
+    if len(key_l.values) != len(key_r.values):
+        return False
+    for i in range(len(key_l.values)):
+        if not key_l.values[i].eq(key_r.values[i]):
+            return False
+    return True
+
+def _key_hash(key):
+    return key.hash
+
+
+class _LRUEntry(object):
+    def __init__(self, key, values_output):
+        self.key = key # type: RelCacheKey | None
+        self.values_output = values_output # type: list[objects.BaseV] | None
+        self.prev = self # type: _LRUEntry
+        self.next = self # type: _LRUEntry
+
+    def unlink(self):
+        self.prev.next = self.next
+        self.next.prev = self.prev
+
+    def link_after(self, entry):
+        self.prev = entry
+        self.next = entry.next
+        entry.next.prev = self
+        entry.next = self
+
+
+class LRUTable(object):
+    """ A bounded table from keys to lists of values, evicting the least
+    recently used entry when full. """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.clear()
+
+    def set_capacity(self, capacity):
+        # type: (int) -> None
+        assert capacity >= 0
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        self.entries = objectmodel.r_dict(_key_eq, _key_hash)
+        # the most recently used entry comes right after the sentinel
+        self.sentinel = _LRUEntry(None, None)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def size(self):
+        return len(self.entries)
+
+    @jit.dont_look_inside
+    def make_key(self, name, values_input):
+        # type: (str, list[objects.BaseV]) -> RelCacheKey
+        """ build the key for a lookup. the key of a miss should be passed on
+        to add, so that the input values are only hashed once. """
+        return RelCacheKey(name, values_input)
+
+    @jit.dont_look_inside
+    def lookup(self, key):
+        # type: (RelCacheKey) -> list[objects.BaseV] | None
+        entry = self.entries.get(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry.unlink()
+        entry.link_after(self.sentinel)
+        return entry.values_output
+
+    @jit.dont_look_inside
+    def add(self, key, values_output):
+        # type: (RelCacheKey, list[objects.BaseV]) -> None
+        entry = self.entries.get(key, None)
+        if entry is not None:
+            entry.values_output = values_output
+            entry.unlink()
+            entry.link_after(self.sentinel)
+            return
+        if len(self.entries) >= self.capacity:
+            oldest = self.sentinel.prev
+            assert oldest is not self.sentinel
+            oldest.unlink()
+            del self.entries[oldest.key]
+            self.evictions += 1
+        entry = _LRUEntry(key, values_output)
+        entry.link_after(self.sentinel)
+        self.entries[key] = entry
+
+
+class RelCache(LRUTable):
+    """ A bounded LRU table of relation results. Only the relations in the
+    allow-list are cached. """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, cached_rels=None):
+        LRUTable.__init__(self, capacity)
+        self.cached_rels = {} # type: dict[str, bool]
+        if cached_rels is None:
+            cached_rels = DEFAULT_CACHED_RELS
+        self.set_cached_rels(cached_rels)
+
+    def set_cached_rels(self, names):
+        # type: (list[str]) -> None
+        self.cached_rels = {}
+        for name in names:
+            self.cached_rels[name] = True
+        self.clear()
+
+    def is_cached_rel(self, name):
+        # type: (str) -> bool
+        return self.capacity > 0 and name in self.cached_rels
+
+    def stats_tostring(self):
+        total = self.hits + self.misses
+        if total:
+            ratio = self.hits * 100.0 / total
+        else:
+            ratio = 0.0
+        return "relation cache: hits=%d misses=%d evictions=%d entries=%d hit-ratio=%s%%" % (
+            self.hits, self.misses, self.evictions, len(self.entries), ratio)
+
+
+DEFAULT_MEMO_CAPACITY = 1024
+
+class FuncMemo(object):
+    """ The memo tables of the pure spec functions (see purity.py), one
+    bounded LRU table per function. The function result is stored as a
+    one-element list, to share the table implementation with RelCache. """
+
+    def __init__(self, capacity=DEFAULT_MEMO_CAPACITY):
+        self.capacity = capacity
+        self.tables = {} # type: dict[str, LRUTable]
+
+    def set_capacity(self, capacity):
+        # type: (int) -> None
+        assert capacity >= 0
+        self.capacity = capacity
+        self.tables = {}
+
+    def is_enabled(self):
+        return self.capacity > 0
+
+    @jit.dont_look_inside
+    def get_table(self, name):
+        # type: (str) -> LRUTable
+        table = self.tables.get(name, None)
+        if table is None:
+            table = LRUTable(self.capacity)
+            self.tables[name] = table
+        return table
+
+    def clear(self):
+        for table in self.tables.values():
+            table.clear()
+
+    def reset_stats(self):
+        for table in self.tables.values():
+            table.reset_stats()
+
+    def saved_evaluations(self):
+        res = 0
+        for table in self.tables.values():
+            res += table.hits
+        return res
+
+    def top_functions(self, limit):
+        # type: (int) -> list[tuple[str, LRUTable]]
+        """ the functions that saved the most evaluations, most first """
+        items = []
+        for name, table in self.tables.items():
+            if table.hits:
+                items.append((name, table))
+        # insertion sort, ties are ordered by name to be deterministic
+        for i in range(1, len(items)):
+            current = items[i]
+            j = i - 1
+            while j >= 0 and _memo_item_lt(current, items[j]):
+                items[j + 1] = items[j]
+                j -= 1
+            items[j + 1] = current
+        if len(items) > limit:
+            items = items[:limit]
+        return items
+
+    def stats_tostring(self, limit=20):
+        lines = ["function memo: saved evaluations=%d functions=%d" % (
+            self.saved_evaluations(), len(self.tables))]
+        for name, table in self.top_functions(limit):
+            lines.append("  %s: saved=%d misses=%d evictions=%d entries=%d" % (
+                name, table.hits, table.misses, table.evictions, table.size()))
+        return "\n".join(lines)
+
+def _memo_item_lt(item_l, item_r):
+    name_l, table_l = item_l
+    name_r, table_r = item_r
+    if table_l.hits != table_r.hits:
+        return table_l.hits > table_r.hits
+    return name_l < name_r
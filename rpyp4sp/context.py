@@ -1,6 +1,7 @@
 from __future__ import print_function
 from rpython.rlib import jit
-from rpyp4sp import p4specast, objects, smalllist, sign
+from rpyp4sp import p4specast, objects, smalllist, sign, purity
+from rpyp4sp.cache import RelCache, FuncMemo
 from rpyp4sp.cover import Coverage
 from rpyp4sp.error import P4ContextError
 from rpython.rlib import jit
@@ -17,6 +18,8 @@ class GlobalContext(object):
         self.tdenv = {}
         self.renv = {}
         self.fenv = {}
+        self.rel_cache = RelCache()
+        self.func_memo = FuncMemo()
         self.empty_envkeys = EnvKeys({}, self)
         self.empty_simple_context = Context.make0(self.empty_envkeys)
         self.empty_context_with_coverage = Context.make0(self.empty_envkeys)
@@ -234,6 +237,9 @@ class Context(sign.Sign):
                 self.venv_keys.glbl.fenv[definition.id.value] = definition
         self.venv_keys.glbl.filename = filename
         self.venv_keys.glbl.derive = derive
+        self.venv_keys.glbl.rel_cache.clear()
+        purity.analyze_effects(self.venv_keys.glbl.fenv, self.venv_keys.glbl.renv)
+        self.venv_keys.glbl.func_memo.clear()
 
     def copy_and_change(self, tdenv=None, fenv=None, venv_keys=None, venv_values=None):
         tdenv = tdenv if tdenv is not None else self.get_tdenv()
@@ -112,6 +112,23 @@ def invoke_func_def(ctx, calle):
             targ = targs[i]
             ctx_local = ctx_local.add_typdef_local(tparam, ([], p4specast.PlainT(targ)))
     ctx, values_input = eval_args(ctx, calle.args)
+    glbl = jit.promote(ctx.venv_keys.glbl)
+    func_memo = glbl.func_memo
+    # pure functions are memoized, see purity.py. like the relation cache,
+    # the memo is bypassed when tracking coverage
+    if (func._memoizable and not glbl.derive and func_memo.is_enabled()
+            and not isinstance(ctx, context.ContextWithCoverage)):
+        table = func_memo.get_table(func.id.value)
+        key = table.make_key(func.id.value, values_input)
+        values_output = table.lookup(key)
+        if values_output is not None:
+            return ctx, values_output[0]
+        ctx, value_output = _invoke_func_def_attempt_clauses(ctx, func, values_input, ctx_local)
+        table.add(key, [value_output])
+        return ctx, value_output
+    return _invoke_func_def_attempt_clauses(ctx, func, values_input, ctx_local)
+
+def _invoke_func_def_attempt_clauses(ctx, func, values_input, ctx_local):
     try:
         return invoke_func_def_attempt_clauses(ctx, func, values_input, ctx_local=ctx_local)
     except P4Error as e:
@@ -195,7 +212,32 @@ invoke_rel_jit_driver = jit.JitDriver(
 
 def invoke_rel(ctx, id, values_input):
     # returns (Ctx.t * value list) option =
+    # if (not ctx.derive) && Cache.is_cached_rule id.it then (
+    glbl = jit.promote(ctx.venv_keys.glbl)
+    rel_cache = glbl.rel_cache
+    # the cache is bypassed when tracking coverage, a cache hit would lose
+    # the phantoms covered by the relation body
+    if (not glbl.derive and not isinstance(ctx, context.ContextWithCoverage)
+            and rel_cache.is_cached_rel(id.value)):
+    #   let cache_result = Cache.Cache.find_opt !rule_cache (id.it, values_input) in
+    #   match cache_result with
+    #   | Some values_output -> Some (ctx, values_output)
+        key = rel_cache.make_key(id.value, values_input)
+        values_output = rel_cache.lookup(key)
+        if values_output is not None:
+            return ctx, values_output
+    #   | None ->
+    #       let* ctx, values_output = attempt_rules () in
+    #       Cache.Cache.add !rule_cache (id.it, values_input) values_output;
+    #       Some (ctx, values_output))
+        ctx, values_output = attempt_rules(ctx, id, values_input)
+        if values_output is not None:
+            rel_cache.add(key, values_output)
+        return ctx, values_output
+    # else attempt_rules ()
+    return attempt_rules(ctx, id, values_input)
 
+def attempt_rules(ctx, id, values_input):
     # let _inputs, exps_input, instrs = Ctx.find_rel Local ctx id in
     reld = ctx.find_rel_local(id)
     # check (instrs <> []) id.at "relation has no instructions";
@@ -225,16 +267,6 @@ def invoke_rel(ctx, id, values_input):
     else:
         return None, None
     #   | _ -> None
-    # in
-    # if (not ctx.derive) && Cache.is_cached_rule id.it then (
-    #   let cache_result = Cache.Cache.find_opt !rule_cache (id.it, values_input) in
-    #   match cache_result with
-    #   | Some values_output -> Some (ctx, values_output)
-    #   | None ->
-    #       let* ctx, values_output = attempt_rules () in
-    #       Cache.Cache.add !rule_cache (id.it, values_input) values_output;
-    #       Some (ctx, values_output))
-    # else attempt_rules ()
 
 def _rel_eval_instrs(ctx_local, reld):
     invoke_rel_jit_driver.jit_merge_point(reld=reld)
@@ -491,6 +491,9 @@ class DecD(Def):
             self._simple_args = False
         self._ctx_env_args_start = None
         self._ctx_env_args_end = None
+        # computed by purity.analyze_effects at load time
+        self._effects = 0
+        self._memoizable = False
 
     def __repr__(self):
         return "p4specast.DecD(%r, %r, %r, %r)" % (self.id, self.tparams, self.args, self.instrs)
@@ -0,0 +1,121 @@
+from rpyp4sp import p4specast, builtin
+from rpyp4sp.astwalk import AstVisitor
+
+# effect analysis of the spec functions, run once by load_spec. a function
+# whose evaluation is a pure function of its arguments can have its results
+# memoized in invoke_func_def.
+
+# calls an impure builtin (fresh_tid), directly or transitively
+EFFECT_FRESH = 1
+# reaches a coverage phantom, directly or transitively
+EFFECT_PHANTOM = 2
+# calls a function that is passed in as an argument. not propagated to the
+# callers, since they pass in a known function (and record it as a callee)
+EFFECT_UNKNOWN_CALL = 4
+
+_PROPAGATED_EFFECTS = EFFECT_FRESH | EFFECT_PHANTOM
+
+
+class DefSummary(object):
+    def __init__(self, definition):
+        self.definition = definition # type: p4specast.DecD | p4specast.RelD
+        self.effects = 0
+        self.funcs = [] # type: list[str]
+        self.rels = [] # type: list[str]
+
+
+class _EffectCollector(AstVisitor):
+    def __init__(self, fenv, summary):
+        self.fenv = fenv # type: dict[str, p4specast.DecD]
+        self.summary = summary # type: DefSummary
+        self.params = {} # type: dict[str, None]
+        definition = summary.definition
+        if isinstance(definition, p4specast.DecD):
+            for arg in definition.args:
+                if isinstance(arg, p4specast.DefA):
+                    self.params[arg.id.value] = None
+
+    def _call(self, name):
+        # a function parameter shadows the global function of the same name
+        if name in self.params:
+            self.summary.effects |= EFFECT_UNKNOWN_CALL
+        elif name in self.fenv:
+            self.summary.funcs.append(name)
+        elif builtin.is_builtin(name):
+            if not builtin.is_pure_builtin(name):
+                self.summary.effects |= EFFECT_FRESH
+        else:
+            self.summary.effects |= EFFECT_UNKNOWN_CALL
+
+    def visit_exp(self, exp):
+        if isinstance(exp, p4specast.CallE):
+            self._call(exp.func.value)
+        self.walk_exp(exp)
+
+    def visit_defa(self, arg):
+        # passing a function on counts as calling it
+        self._call(arg.id.value)
+
+    def visit_instr(self, instr):
+        if isinstance(instr, p4specast.RuleI):
+            self.summary.rels.append(instr.id.value)
+        elif isinstance(instr, p4specast.HoldI):
+            self.summary.rels.append(instr.id.value)
+        self.walk_instr(instr)
+
+    def visit_phantom(self, phantom):
+        if phantom is not None:
+            self.summary.effects |= EFFECT_PHANTOM
+
+
+def analyze_effects(fenv, renv):
+    # type: (dict[str, p4specast.DecD], dict[str, p4specast.RelD]) -> None
+    """ compute the effects of all functions and relations, and mark the
+    functions whose results can be memoized. """
+    func_summaries = {}
+    rel_summaries = {}
+    summaries = []
+    for name, func in fenv.items():
+        summary = DefSummary(func)
+        _EffectCollector(fenv, summary).visit_def(func)
+        func_summaries[name] = summary
+        summaries.append(summary)
+    for name, reld in renv.items():
+        summary = DefSummary(reld)
+        _EffectCollector(fenv, summary).visit_def(reld)
+        rel_summaries[name] = summary
+        summaries.append(summary)
+    # propagate the effects along the (possibly recursive) call graph until
+    # nothing changes anymore
+    changed = True
+    while changed:
+        changed = False
+        for summary in summaries:
+            effects = summary.effects
+            for name in summary.funcs:
+                effects |= func_summaries[name].effects & _PROPAGATED_EFFECTS
+            for name in summary.rels:
+                rel_summary = rel_summaries.get(name, None)
+                if rel_summary is not None:
+                    effects |= rel_summary.effects & _PROPAGATED_EFFECTS
+            if effects != summary.effects:
+                summary.effects = effects
+                changed = True
+    for name, summary in func_summaries.items():
+        func = fenv[name]
+        func._effects = summary.effects
+        func._memoizable = _is_memoizable(func, summary.effects)
+
+def _is_memoizable(func, effects):
+    # type: (p4specast.DecD, int) -> bool
+    # phantoms only have an effect when coverage is tracked, and the memo is
+    # bypassed completely then
+    if effects & (EFFECT_FRESH | EFFECT_UNKNOWN_CALL):
+        return False
+    # the type arguments of generic functions are not part of the memo key
+    if func.tparams:
+        return False
+    for arg in func.args:
+        if not isinstance(arg, p4specast.ExpA):
+            return False
+    return len(func.instrs) > 0
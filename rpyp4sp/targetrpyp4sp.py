@@ -41,6 +41,59 @@ def parse_flag(argv, flagname, longname=""):
     return bool(parse_args(argv, flagname, longname=longname, want_arg=False))
 
 
+def parse_rel_cache_args(argv, ctx):
+    # configure the relation result cache. returns a tuple (ok, print_stats),
+    # ok is False if the arguments were invalid
+    rel_cache = ctx.venv_keys.glbl.rel_cache
+    print_stats = parse_flag(argv, "--rel-cache-stats")
+    rels = parse_args(argv, "--rel-cache")
+    if rels is not None:
+        if rels == "none":
+            rel_cache.set_cached_rels([])
+        else:
+            names = rels.split(",")
+            for name in names:
+                if not name:
+                    print("invalid relation name in --rel-cache: %s" % rels)
+                    return False, print_stats
+            rel_cache.set_cached_rels(names)
+    size = parse_args(argv, "--rel-cache-size")
+    if size is not None:
+        try:
+            capacity = int(size)
+        except ValueError:
+            capacity = -1
+        if capacity < 0:
+            print("--rel-cache-size needs a non-negative integer, got: %s" % size)
+            return False, print_stats
+        rel_cache.set_capacity(capacity)
+    return True, print_stats
+
+def print_rel_cache_stats(ctx, prefix):
+    print("# %s %s" % (prefix, ctx.venv_keys.glbl.rel_cache.stats_tostring()))
+
+def parse_func_memo_args(argv, ctx):
+    # configure the memo tables of the pure functions. returns a tuple
+    # (ok, print_stats), ok is False if the arguments were invalid
+    func_memo = ctx.venv_keys.glbl.func_memo
+    print_stats = parse_flag(argv, "--memo-stats")
+    size = parse_args(argv, "--memo-size")
+    if size is not None:
+        try:
+            capacity = int(size)
+        except ValueError:
+            capacity = -1
+        if capacity < 0:
+            print("--memo-size needs a non-negative integer, got: %s" % size)
+            return False, print_stats
+        func_memo.set_capacity(capacity)
+    return True, print_stats
+
+def print_func_memo_stats(ctx, prefix):
+    for line in ctx.venv_keys.glbl.func_memo.stats_tostring().split("\n"):
+        print("# %s %s" % (prefix, line))
+
+
 def command_run_test_jsonl(argv):
     ctx = make_context()
     passed = 0
@@ -162,6 +215,14 @@ def command_run_test_jsonl(argv):
 def command_run_p4(argv):
     ctx = make_context()
     print_times = not parse_flag(argv, "--no-times")
+    ok, print_cache_stats = parse_rel_cache_args(argv, ctx)
+    if not ok:
+        return -1
+    ok, print_memo_stats = parse_func_memo_args(argv, ctx)
+    if not ok:
+        return -1
+    rel_cache = ctx.venv_keys.glbl.rel_cache
+    func_memo = ctx.venv_keys.glbl.func_memo
     load_times = []
     run_times = []
     passed = 0
@@ -182,6 +243,8 @@ def command_run_p4(argv):
             print("program loaded in %ss" % (t2 - t1))
         load_times.append(t2 - t1)
         resctx = None
+        rel_cache.reset_stats()
+        func_memo.reset_stats()
         try:
             resctx, values = interp.invoke_rel(ctx, p4specast.Id("Program_ok", p4specast.NO_REGION), [value])
         except P4Error as e:
@@ -198,6 +261,10 @@ def command_run_p4(argv):
         else:
             passed += 1
             print("well-typed")
+        if print_cache_stats:
+            print_rel_cache_stats(ctx, fn)
+        if print_memo_stats:
+            print_func_memo_stats(ctx, fn)
         p = rsignal.pypysig_getaddr_occurred()
         if p.c_value < 0:
             # ctrl-c was pressed
@@ -240,9 +307,17 @@ def command_bench_p4(argv):
     t1 = time.time()
     ctx = make_context()
     t2 = time.time()
+    ok, print_cache_stats = parse_rel_cache_args(argv, ctx)
+    if not ok:
+        return -1
+    ok, print_memo_stats = parse_func_memo_args(argv, ctx)
+    if not ok:
+        return -1
+    rel_cache = ctx.venv_keys.glbl.rel_cache
+    func_memo = ctx.venv_keys.glbl.func_memo
     fns = argv[1:]
     if not fns:
-        print("usage: %s bench-p4-json [-n/--repetitions N] [-c/--comment COMMENT] fn1, fn2, fn3, ...")
+        print("usage: %s bench-p4-json [-n/--repetitions N] [-c/--comment COMMENT] [--rel-cache REL1,REL2,...|none] [--rel-cache-size N] [--rel-cache-stats] [--memo-size N] [--memo-stats] fn1, fn2, fn3, ...")
         return -1
     print_csv_line("filename", "action", "iteration", "time", "outcome", "comment", "epoch", "executable")
     print_csv_line("ast.json", "load", "0", str(t2 - t1), "ok", comment, str(t2), argv[0])
@@ -264,6 +339,12 @@ def command_bench_p4(argv):
         t2 = time.time()
         print_csv_line(fn, "load", "0", str(t2 - t1), "ok", comment, str(t2), argv[0])
         for i in range(reps):
+            # every iteration starts with a cold relation cache and memo,
+            # otherwise only the first one would measure the misses
+            rel_cache.clear()
+            rel_cache.reset_stats()
+            func_memo.clear()
+            func_memo.reset_stats()
             t1 = time.time()
             resctx = None
             res = None
@@ -280,6 +361,10 @@ def command_bench_p4(argv):
             else:
                 res = "passed"
             print_csv_line(fn, "run", str(i), str(t2 - t1), res, comment, str(t2), argv[0])
+            if print_cache_stats:
+                print_rel_cache_stats(ctx, "%s %d" % (fn, i))
+            if print_memo_stats:
+                print_func_memo_stats(ctx, "%s %d" % (fn, i))
     return 0
 
 
@@ -0,0 +1,76 @@
+import pytest
+from rpython.rlib.rbigint import rbigint
+from rpyp4sp import p4specast, objects, integers
+from rpyp4sp.cache import RelCache, hash_value
+
+
+def mknat(val):
+    return objects.NumV.fromstr(str(val), p4specast.NatT.INSTANCE, p4specast.NumT.NAT)
+
+def mktext(s, typname='id'):
+    return objects.TextV(s, p4specast.VarT(p4specast.Id(typname, p4specast.NO_REGION), []))
+
+def mkcase(atom, values):
+    mixop = p4specast.MixOp([p4specast.AtomT(atom)] + [None] * len(values))
+    return objects.CaseV.make(values, mixop, p4specast.VarT(p4specast.Id('typ', p4specast.NO_REGION), []))
+
+
+def test_hash_value_ignores_types():
+    assert hash_value(mktext('a', 'id')) == hash_value(mktext('a', 'tid'))
+    assert hash_value(mkcase('A', [mknat(1)])) == hash_value(mkcase('A', [mknat(1)]))
+
+def test_hash_value_bigint_fits_word():
+    small = objects.NumV.make(integers.SmallInteger(5), p4specast.NatT.INSTANCE)
+    big = objects.NumV.make(integers.BigInteger(rbigint.fromint(5)), p4specast.NatT.INSTANCE)
+    assert small.eq(big)
+    assert hash_value(small) == hash_value(big)
+
+def lookup(cache, name, values):
+    return cache.lookup(cache.make_key(name, values))
+
+def add(cache, name, values, values_output):
+    cache.add(cache.make_key(name, values), values_output)
+
+def test_rel_cache_hit_miss():
+    cache = RelCache(capacity=4, cached_rels=['Sub_expl'])
+    assert cache.is_cached_rel('Sub_expl')
+    assert not cache.is_cached_rel('Program_ok')
+    key = cache.make_key('Sub_expl', [mknat(1)])
+    assert cache.lookup(key) is None
+    res = [objects.BoolV.TRUE]
+    # the key of the miss is reused for adding the result
+    cache.add(key, res)
+    assert lookup(cache, 'Sub_expl', [mknat(1)]) is res
+    assert lookup(cache, 'Sub_impl', [mknat(1)]) is None
+    assert lookup(cache, 'Sub_expl', [mknat(2)]) is None
+    assert cache.hits == 1
+    assert cache.misses == 3
+
+def test_rel_cache_lru_eviction():
+    cache = RelCache(capacity=2, cached_rels=['R'])
+    add(cache, 'R', [mknat(1)], [mknat(10)])
+    add(cache, 'R', [mknat(2)], [mknat(20)])
+    # touch the first entry, so the second one is evicted
+    assert lookup(cache, 'R', [mknat(1)])[0].eq(mknat(10))
+    add(cache, 'R', [mknat(3)], [mknat(30)])
+    assert cache.evictions == 1
+    assert cache.size() == 2
+    assert lookup(cache, 'R', [mknat(2)]) is None
+    assert lookup(cache, 'R', [mknat(1)]) is not None
+    assert lookup(cache, 'R', [mknat(3)]) is not None
+
+def test_rel_cache_clear_keeps_stats():
+    cache = RelCache(capacity=2, cached_rels=['R'])
+    add(cache, 'R', [mknat(1)], [mknat(10)])
+    assert lookup(cache, 'R', [mknat(1)]) is not None
+    cache.clear()
+    assert cache.size() == 0
+    assert cache.hits == 1
+    cache.reset_stats()
+    assert cache.hits == cache.misses == cache.evictions == 0
+
+def test_rel_cache_disabled():
+    cache = RelCache(cached_rels=[])
+    assert not cache.is_cached_rel('Sub_expl')
+    cache = RelCache(capacity=0)
+    assert not cache.is_cached_rel('Sub_expl')
@@ -6,6 +6,7 @@ import os
 from rpyp4sp.rpyjson import loads
 from rpyp4sp.context import Context, ContextWithCoverage
 from rpyp4sp import p4specast, objects, interp, rpyjson
+from rpyp4sp.cache import DEFAULT_CACHED_RELS
 
 currfile = os.path.abspath(__file__)
 basedir = os.path.dirname(os.path.dirname(os.path.dirname(currfile)))
@@ -171,14 +172,65 @@ def test_eval_num_expr():
     _, value = interp.eval_exp(None, exp)
     assert value.eq(objects.NumV.fromstr('0', p4specast.NatT.INSTANCE))
 
+def type_alpha_inputs():
+    return [objects.CaseV.make([objects.TextV('metadata', p4specast.VarT(p4specast.Id('id', p4specast.NO_REGION), [])), objects.ListV.make([], p4specast.IterT(p4specast.TupleT([p4specast.VarT(p4specast.Id('member', p4specast.Region(p4specast.Position('spec/1a-syntax-el.watsup', 35, 7), p4specast.Position('spec/1a-syntax-el.watsup', 35, 13))), []), p4specast.VarT(p4specast.Id('typ', p4specast.Region(p4specast.Position('spec/2c3-runtime-type-subst.watsup', 16, 29), p4specast.Position('spec/2c3-runtime-type-subst.watsup', 16, 32))), [])]), p4specast.List()))], p4specast.MixOp([p4specast.AtomT('StructT', p4specast.Region(p4specast.Position('spec/2c1-runtime-type.watsup', 66, 4), p4specast.Position('spec/2c1-runtime-type.watsup', 66, 11))), None, None]), p4specast.VarT(p4specast.Id('datatyp', p4specast.Region(p4specast.Position('spec/2c1-runtime-type.watsup', 59, 7), p4specast.Position('spec/2c1-runtime-type.watsup', 59, 14))), [])), objects.CaseV.make([objects.TextV('metadata', p4specast.VarT(p4specast.Id('id', p4specast.NO_REGION), [])), objects.ListV.make([], p4specast.IterT(p4specast.TupleT([p4specast.VarT(p4specast.Id('member', p4specast.Region(p4specast.Position('spec/1a-syntax-el.watsup', 35, 7), p4specast.Position('spec/1a-syntax-el.watsup', 35, 13))), []), p4specast.VarT(p4specast.Id('typ', p4specast.Region(p4specast.Position('spec/2c3-runtime-type-subst.watsup', 16, 29), p4specast.Position('spec/2c3-runtime-type-subst.watsup', 16, 32))), [])]), p4specast.List()))], p4specast.MixOp([p4specast.AtomT('StructT', p4specast.Region(p4specast.Position('spec/2c1-runtime-type.watsup', 66, 4), p4specast.Position('spec/2c1-runtime-type.watsup', 66, 11))), None, None]), p4specast.VarT(p4specast.Id('datatyp', p4specast.Region(p4specast.Position('spec/2c1-runtime-type.watsup', 59, 7), p4specast.Position('spec/2c1-runtime-type.watsup', 59, 14))), []))]
+
 def test_type_alpha():
-    input_values = [objects.CaseV.make([objects.TextV('metadata', p4specast.VarT(p4specast.Id('id', p4specast.NO_REGION), [])), objects.ListV.make([], p4specast.IterT(p4specast.TupleT([p4specast.VarT(p4specast.Id('member', p4specast.Region(p4specast.Position('spec/1a-syntax-el.watsup', 35, 7), p4specast.Position('spec/1a-syntax-el.watsup', 35, 13))), []), p4specast.VarT(p4specast.Id('typ', p4specast.Region(p4specast.Position('spec/2c3-runtime-type-subst.watsup', 16, 29), p4specast.Position('spec/2c3-runtime-type-subst.watsup', 16, 32))), [])]), p4specast.List()))], p4specast.MixOp([p4specast.AtomT('StructT', p4specast.Region(p4specast.Position('spec/2c1-runtime-type.watsup', 66, 4), p4specast.Position('spec/2c1-runtime-type.watsup', 66, 11))), None, None]), p4specast.VarT(p4specast.Id('datatyp', p4specast.Region(p4specast.Position('spec/2c1-runtime-type.watsup', 59, 7), p4specast.Position('spec/2c1-runtime-type.watsup', 59, 14))), [])), objects.CaseV.make([objects.TextV('metadata', p4specast.VarT(p4specast.Id('id', p4specast.NO_REGION), [])), objects.ListV.make([], p4specast.IterT(p4specast.TupleT([p4specast.VarT(p4specast.Id('member', p4specast.Region(p4specast.Position('spec/1a-syntax-el.watsup', 35, 7), p4specast.Position('spec/1a-syntax-el.watsup', 35, 13))), []), p4specast.VarT(p4specast.Id('typ', p4specast.Region(p4specast.Position('spec/2c3-runtime-type-subst.watsup', 16, 29), p4specast.Position('spec/2c3-runtime-type-subst.watsup', 16, 32))), [])]), p4specast.List()))], p4specast.MixOp([p4specast.AtomT('StructT', p4specast.Region(p4specast.Position('spec/2c1-runtime-type.watsup', 66, 4), p4specast.Position('spec/2c1-runtime-type.watsup', 66, 11))), None, None]), p4specast.VarT(p4specast.Id('datatyp', p4specast.Region(p4specast.Position('spec/2c1-runtime-type.watsup', 59, 7), p4specast.Position('spec/2c1-runtime-type.watsup', 59, 14))), []))]
+    input_values = type_alpha_inputs()
     name = 'Type_alpha'
     ctx = make_context(track_coverage=True)
     resctx, values = interp.invoke_rel(ctx, p4specast.AtomT(name, None), input_values)
     assert repr(resctx._cover) == 'Coverage(ImmutableIntSet.from_list([]), ImmutableIntSet.from_list([38, 39, 40, 41]))'
     assert values == []
 
+def _with_cached_type_alpha(ctx, func):
+    rel_cache = ctx.venv_keys.glbl.rel_cache
+    rel_cache.set_cached_rels(['Type_alpha'])
+    rel_cache.reset_stats()
+    try:
+        return func(rel_cache)
+    finally:
+        rel_cache.set_cached_rels(DEFAULT_CACHED_RELS)
+        rel_cache.reset_stats()
+
+def test_invoke_rel_cache_hit():
+    ctx = make_context()
+    def check(rel_cache):
+        _, values1 = interp.invoke_rel(ctx, p4specast.Id('Type_alpha', p4specast.NO_REGION), type_alpha_inputs())
+        assert rel_cache.misses == 1
+        assert rel_cache.hits == 0
+        assert rel_cache.size() == 1
+        resctx, values2 = interp.invoke_rel(ctx, p4specast.Id('Type_alpha', p4specast.NO_REGION), type_alpha_inputs())
+        assert rel_cache.hits == 1
+        assert resctx is ctx
+        assert values2 is values1
+    _with_cached_type_alpha(ctx, check)
+
+def test_invoke_rel_cache_bypassed_when_deriving():
+    ctx = make_context()
+    glbl = ctx.venv_keys.glbl
+    def check(rel_cache):
+        glbl.derive = True
+        try:
+            interp.invoke_rel(ctx, p4specast.Id('Type_alpha', p4specast.NO_REGION), type_alpha_inputs())
+            interp.invoke_rel(ctx, p4specast.Id('Type_alpha', p4specast.NO_REGION), type_alpha_inputs())
+        finally:
+            glbl.derive = False
+        assert rel_cache.hits == rel_cache.misses == 0
+        assert rel_cache.size() == 0
+    _with_cached_type_alpha(ctx, check)
+
+def test_invoke_rel_cache_bypassed_with_coverage():
+    ctx = make_context(track_coverage=True)
+    def check(rel_cache):
+        for i in range(2):
+            resctx, values = interp.invoke_rel(ctx, p4specast.Id('Type_alpha', p4specast.NO_REGION), type_alpha_inputs())
+            # the phantoms are still covered on the second call
+            assert repr(resctx._cover) == 'Coverage(ImmutableIntSet.from_list([]), ImmutableIntSet.from_list([38, 39, 40, 41]))'
+        assert rel_cache.hits == rel_cache.misses == 0
+        assert rel_cache.size() == 0
+    _with_cached_type_alpha(ctx, check)
+
 
 def iter_all(fn):
     with open(fn, 'r') as f:
@@ -0,0 +1,142 @@
+from rpyp4sp import p4specast, objects, interp, purity
+from rpyp4sp.context import Context
+
+R = p4specast.NO_REGION
+
+def mkid(name):
+    return p4specast.Id(name, R)
+
+def mkvar(name):
+    return p4specast.VarE(mkid(name), p4specast.NatT.INSTANCE, R)
+
+def mkcall(name, *args):
+    return p4specast.CallE(mkid(name), [], [p4specast.ExpA(arg) for arg in args],
+                           p4specast.NatT.INSTANCE, R)
+
+def mkfunc(name, params, instrs, tparams=None):
+    args = [p4specast.ExpA(mkvar(param)) for param in params]
+    return p4specast.DecD(mkid(name), tparams or [], args, instrs)
+
+def mkrel(name, instrs):
+    mixop = p4specast.MixOp([p4specast.AtomT('OK')])
+    return p4specast.RelD(mkid(name), mixop, [], [], instrs)
+
+def mkrule(name):
+    notexp = p4specast.NotExp(p4specast.MixOp([p4specast.AtomT('OK')]), [])
+    return p4specast.RuleI(mkid(name), notexp, [])
+
+def analyze(*definitions):
+    fenv = {}
+    renv = {}
+    for definition in definitions:
+        if isinstance(definition, p4specast.DecD):
+            fenv[definition.id.value] = definition
+        else:
+            renv[definition.id.value] = definition
+    purity.analyze_effects(fenv, renv)
+
+def mknat(val):
+    return objects.NumV.fromstr(str(val), p4specast.NatT.INSTANCE, p4specast.NumT.NAT)
+
+
+def test_pure_function():
+    f = mkfunc('f', ['x'], [p4specast.ReturnI(mkcall('sum', mkvar('x')))])
+    analyze(f)
+    assert f._effects == 0
+    assert f._memoizable
+
+def test_fresh_tid_is_transitive():
+    fresh = mkfunc('fresh', [], [p4specast.ReturnI(mkcall('fresh_tid'))])
+    g = mkfunc('g', ['x'], [p4specast.ReturnI(mkcall('fresh'))])
+    h = mkfunc('h', ['x'], [p4specast.ReturnI(mkcall('g', mkvar('x')))])
+    analyze(fresh, g, h)
+    for func in [fresh, g, h]:
+        assert func._effects & purity.EFFECT_FRESH
+        assert not func._memoizable
+
+def test_fresh_tid_through_relation():
+    fresh = mkfunc('fresh', [], [p4specast.ReturnI(mkcall('fresh_tid'))])
+    rel = mkrel('Rel_fresh', [p4specast.LetI(mkvar('t'), mkcall('fresh'), []),
+                              p4specast.ResultI([])])
+    f = mkfunc('f', ['x'], [mkrule('Rel_fresh'), p4specast.ReturnI(mkvar('x'))])
+    analyze(fresh, rel, f)
+    assert not f._memoizable
+
+def test_recursive_functions():
+    # the effects reach a fixpoint on recursive call graphs
+    f = mkfunc('f', ['x'], [p4specast.ReturnI(mkcall('g', mkvar('x')))])
+    g = mkfunc('g', ['x'], [p4specast.ReturnI(mkcall('f', mkvar('x')))])
+    analyze(f, g)
+    assert f._memoizable and g._memoizable
+    fresh = mkfunc('fresh', [], [p4specast.ReturnI(mkcall('fresh_tid'))])
+    g = mkfunc('g', ['x'], [p4specast.ReturnI(mkcall('f', mkcall('fresh')))])
+    analyze(f, g, fresh)
+    assert not f._memoizable and not g._memoizable
+
+def test_phantom_is_recorded():
+    cond = p4specast.BoolE(True, p4specast.BoolT.INSTANCE, R)
+    ifi = p4specast.IfI(cond, [], [p4specast.ReturnI(mkvar('x'))], p4specast.Phantom(0, []))
+    f = mkfunc('f', ['x'], [ifi])
+    g = mkfunc('g', ['x'], [p4specast.ReturnI(mkcall('f', mkvar('x')))])
+    analyze(f, g)
+    assert g._effects == purity.EFFECT_PHANTOM
+    # phantoms only matter when tracking coverage, which bypasses the memo
+    assert g._memoizable
+
+def test_function_parameters_are_not_memoizable():
+    f = p4specast.DecD(mkid('f'), [], [p4specast.DefA(mkid('p')), p4specast.ExpA(mkvar('x'))],
+                       [p4specast.ReturnI(mkcall('p', mkvar('x')))])
+    g = mkfunc('g', ['x'], [p4specast.ReturnI(mkvar('x'))])
+    call_f = p4specast.CallE(mkid('f'), [], [p4specast.DefA(mkid('g')), p4specast.ExpA(mkvar('x'))],
+                             p4specast.NatT.INSTANCE, R)
+    h = mkfunc('h', ['x'], [p4specast.ReturnI(call_f)])
+    analyze(f, g, h)
+    assert f._effects & purity.EFFECT_UNKNOWN_CALL
+    assert not f._memoizable
+    # the caller passes a known, pure function
+    assert h._memoizable
+
+def test_generic_functions_are_not_memoizable():
+    f = mkfunc('f', ['x'], [p4specast.ReturnI(mkvar('x'))],
+               tparams=[p4specast.TParam('T', R)])
+    analyze(f)
+    assert f._effects == 0
+    assert not f._memoizable
+
+
+def make_ctx(*definitions):
+    ctx = Context.make0()
+    ctx.load_spec(list(definitions), {}, None, 'dummy')
+    return ctx
+
+def test_invoke_func_def_memo():
+    f = mkfunc('f', ['x'], [p4specast.ReturnI(mkcall('sum', mkvar('x')))])
+    ctx = make_ctx(f)
+    assert f._memoizable
+    nats = objects.ListV.make([mknat(1), mknat(2)], p4specast.NatT.INSTANCE)
+    call = mkcall('f', p4specast.LiteralE(nats))
+    _, value1 = interp.invoke_func_def(ctx, call)
+    _, value2 = interp.invoke_func_def(ctx, call)
+    assert value1.eq(mknat(3))
+    assert value2 is value1
+    table = ctx.venv_keys.glbl.func_memo.get_table('f')
+    assert table.hits == 1
+    assert table.misses == 1
+
+def test_invoke_func_def_no_memo_for_fresh():
+    fresh = mkfunc('fresh', ['x'], [p4specast.ReturnI(mkcall('fresh_tid'))])
+    ctx = make_ctx(fresh)
+    call = mkcall('fresh', p4specast.LiteralE(mknat(1)))
+    _, value1 = interp.invoke_func_def(ctx, call)
+    _, value2 = interp.invoke_func_def(ctx, call)
+    assert not value1.eq(value2)
+    assert 'fresh' not in ctx.venv_keys.glbl.func_memo.tables
+
+def test_invoke_func_def_memo_disabled():
+    f = mkfunc('f', ['x'], [p4specast.ReturnI(mkvar('x'))])
+    ctx = make_ctx(f)
+    ctx.venv_keys.glbl.func_memo.set_capacity(0)
+    call = mkcall('f', p4specast.LiteralE(mknat(1)))
+    _, value = interp.invoke_func_def(ctx, call)
+    assert value.eq(mknat(1))
+    assert not ctx.venv_keys.glbl.func_memo.tables